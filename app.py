@@ -1,3 +1,9 @@
+import bisect
+import os
+import re
+import shutil
+import tempfile
+
 import streamlit as st
 
 # Set page config
@@ -9,13 +15,139 @@ st.set_page_config(
 
 # Try to import transformers with error handling
 try:
-    from transformers import pipeline
+    from transformers import AutoModelForQuestionAnswering, AutoTokenizer, pipeline
     TRANSFORMERS_AVAILABLE = True
 except ImportError as e:
     st.error(f"Error importing transformers: {e}")
     st.error("Please make sure transformers is properly installed")
     TRANSFORMERS_AVAILABLE = False
 
+# ONNX Runtime is optional - fall back to the PyTorch pipeline without it
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForQuestionAnswering, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    ONNX_AVAILABLE = True
+    # The FP16 path needs the onnxruntime-gpu build; the default CPU wheel has no CUDA provider
+    CUDA_AVAILABLE = "CUDAExecutionProvider" in onnxruntime.get_available_providers()
+except ImportError:
+    ONNX_AVAILABLE = False
+    CUDA_AVAILABLE = False
+
+# Distilled model by default, full RoBERTa only when accuracy is requested.
+# Both are trained on SQuAD 2.0, so their "no answer" score is meaningful.
+QA_MODELS = {
+    "fast (distilled)": 'deepset/tinyroberta-squad2',
+    "accurate (roberta-base)": 'deepset/roberta-base-squad2',
+}
+DEFAULT_MODEL_CHOICE = "fast (distilled)"
+# Approximate characters of the document rendered at a time in the Document View tab
+DOCUMENT_PAGE_SIZE = 5000
+# Exported/quantized ONNX models are kept here so export runs once per container.
+# Point QA_ONNX_CACHE_DIR at a shared volume to reuse the export across workers and restarts.
+ONNX_CACHE_DIR = os.environ.get("QA_ONNX_CACHE_DIR", os.path.join(tempfile.gettempdir(), "qa_onnx"))
+
+def export_onnx_model(model_dir, export):
+    """Run export(tmp_dir) in a scratch directory, then move the result to model_dir in one step.
+    
+    Workers sharing ONNX_CACHE_DIR never see a half-written export. If another worker
+    finishes first, its copy is kept and this one is discarded.
+    """
+    os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=ONNX_CACHE_DIR)
+    try:
+        export(tmp_dir)
+        try:
+            os.replace(tmp_dir, model_dir)
+        except OSError:
+            if not os.path.isdir(model_dir):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def load_quantized_onnx_model(model_name):
+    """Export the model to ONNX once and quantize it to INT8 for CPU inference."""
+    model_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+    quantized_file = "model_quantized.onnx"
+    
+    def export(export_dir):
+        onnx_model = ORTModelForQuestionAnswering.from_pretrained(model_name, export=True)
+        onnx_model.save_pretrained(export_dir)
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=export_dir, quantization_config=qconfig)
+    
+    if not os.path.exists(os.path.join(model_dir, quantized_file)):
+        export_onnx_model(model_dir, export)
+    
+    return ORTModelForQuestionAnswering.from_pretrained(
+        model_dir,
+        file_name=quantized_file,
+        provider="CPUExecutionProvider"
+    )
+
+def load_fp16_onnx_model(model_name):
+    """Export the model to ONNX once, fuse its transformer ops and cast it to FP16 for GPU inference."""
+    # Only the GPU path needs the transformer optimizer, so a broken import must not disable the INT8 path
+    from onnxruntime.transformers import optimizer
+    
+    model_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--") + "-fp16")
+    fp16_file = "model_fp16.onnx"
+    
+    def export(export_dir):
+        onnx_model = ORTModelForQuestionAnswering.from_pretrained(model_name, export=True)
+        onnx_model.save_pretrained(export_dir)
+        opt_model = optimizer.optimize_model(
+            os.path.join(export_dir, "model.onnx"),
+            model_type='bert',
+            num_heads=onnx_model.config.num_attention_heads,
+            hidden_size=onnx_model.config.hidden_size,
+            opt_level=99,
+            use_gpu=True
+        )
+        opt_model.convert_float_to_float16(keep_io_types=True)
+        opt_model.save_model_to_file(os.path.join(export_dir, fp16_file))
+    
+    if not os.path.exists(os.path.join(model_dir, fp16_file)):
+        export_onnx_model(model_dir, export)
+    
+    return ORTModelForQuestionAnswering.from_pretrained(
+        model_dir,
+        file_name=fp16_file,
+        provider="CUDAExecutionProvider"
+    )
+
+# Tokenizer and model are cached separately so switching models only loads what changed
+@st.cache_resource
+def load_tokenizer(model_name):
+    return AutoTokenizer.from_pretrained(model_name)
+
+@st.cache_resource
+def load_model(model_name):
+    if ONNX_AVAILABLE:
+        if CUDA_AVAILABLE:
+            model = load_fp16_onnx_model(model_name)
+        else:
+            model = load_quantized_onnx_model(model_name)
+    else:
+        model = AutoModelForQuestionAnswering.from_pretrained(model_name)
+    
+    # Warm up with a dummy question so kernel setup happens at load time, not on the first real question
+    warmup = pipeline(task='question-answering', model=model, tokenizer=load_tokenizer(model_name))
+    warmup(question="x", context="x y z")
+    return model
+
+def load_qa_model(model_name=QA_MODELS[DEFAULT_MODEL_CHOICE]):
+    try:
+        return pipeline(
+            task='question-answering',
+            model=load_model(model_name),
+            tokenizer=load_tokenizer(model_name)
+        )
+    except Exception as e:
+        st.error(f"Error loading model: {str(e)}")
+        return None
+
 # Show loading animation immediately
 if 'app_loaded' not in st.session_state:
     st.session_state.app_loaded = False
@@ -44,24 +176,93 @@ if not st.session_state.app_loaded:
     
     # Load the model in the background
     with st.spinner("Initializing AI model..."):
-        try:
-            qa_model = pipeline(task='question-answering', model='deepset/roberta-base-squad2')
-            st.session_state.qa_model = qa_model
+        # The loaded model lives in the st.cache_resource caches; only success matters here
+        qa_model = load_qa_model()
+        if qa_model is not None:
             st.session_state.app_loaded = True
             st.rerun()
-        except Exception as e:
-            st.error(f"Error loading model: {str(e)}")
+        else:
             st.error("This might be due to insufficient memory or network issues on Streamlit Cloud")
             st.stop()
 
-# Cache the model loading
-@st.cache_resource
-def load_qa_model():
-    try:
-        return pipeline(task='question-answering', model='deepset/roberta-base-squad2')
-    except Exception as e:
-        st.error(f"Error loading model: {str(e)}")
-        return None
+def page_offsets(text, page_size):
+    """Start offsets of pages of at most page_size characters, cut after whitespace so words stay whole."""
+    offsets = [0]
+    while len(text) - offsets[-1] > page_size:
+        start = offsets[-1]
+        end = start + page_size
+        cut = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+        offsets.append(cut + 1 if cut > start else end)
+    return offsets
+
+def highlight_matches(text, pattern, template):
+    """Wrap every match of pattern in text using template, in a single pass."""
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        parts.append(text[last:match.start()])
+        parts.append(template.format(match.group()))
+        last = match.end()
+    parts.append(text[last:])
+    return ''.join(parts)
+
+def display_answer(prediction):
+    """Render a single pipeline prediction with confidence metrics and context."""
+    if not prediction['answer']:
+        st.warning("No answer to this question was found in the document")
+        return
+    
+    # Answer display
+    st.markdown(f"""
+    <div style="
+        background-color: #f0f2f6;
+        padding: 20px;
+        border-radius: 10px;
+        border-left: 5px solid #1f77b4;
+        margin: 10px 0;
+    ">
+        <h3 style="margin-top: 0; color: #1f77b4;">
+            {prediction['answer']}
+        </h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Confidence metrics
+    confidence = round(prediction['score'] * 100, 1)
+    
+    col_conf1, col_conf2, col_conf3 = st.columns(3)
+    with col_conf1:
+        st.metric("Confidence", f"{confidence}%")
+    
+    with col_conf2:
+        if confidence >= 60:
+            st.success("High Confidence")
+        elif confidence >= 30:
+            st.warning("Medium Confidence")
+        else:
+            st.error("Low Confidence")
+    
+    with col_conf3:
+        st.metric("Answer Length", f"{len(prediction['answer'])} chars")
+    
+    # Context view - the pipeline already reports where the answer starts and ends
+    document_text = st.session_state.document_text
+    start_pos = prediction['start']
+    end_pos = prediction['end']
+    context_start = max(0, start_pos - 200)
+    context_end = min(len(document_text), end_pos + 200)
+    
+    with st.expander("View answer in context"):
+        highlighted_context = (
+            document_text[context_start:start_pos]
+            + f"**{document_text[start_pos:end_pos]}**"
+            + document_text[end_pos:context_end]
+        )
+        st.markdown(highlighted_context)
+    
+    # Technical details
+    with st.expander("Technical Details"):
+        st.json(prediction)
 
 def main():
     st.title("Document Question Answering System")
@@ -72,9 +273,20 @@ def main():
         st.session_state.document_text = ""
     if 'current_question' not in st.session_state:
         st.session_state.current_question = ""
+    if 'model_choice' not in st.session_state:
+        st.session_state.model_choice = DEFAULT_MODEL_CHOICE
     
     # Sidebar for text input
     with st.sidebar:
+        st.header("Model")
+        st.radio(
+            "Model",
+            list(QA_MODELS),
+            key="model_choice",
+            label_visibility="collapsed",
+            help="The distilled model is roughly twice as fast; RoBERTa gives more accurate answers"
+        )
+        
         st.header("Document Input")
         
         # Text input area
@@ -111,13 +323,14 @@ def main():
         with tab1:
             st.success("AI model loaded and ready")
             
-            st.header("Ask Your Question")
+            st.header("Ask Your Questions")
             
             # Question input
-            question = st.text_input(
-                "Enter your question:",
+            question = st.text_area(
+                "Questions (one per line):",
                 value=st.session_state.current_question,
-                placeholder="Type your question about the document...",
+                height=120,
+                placeholder="Type one or more questions about the document, one per line...",
                 key="question_input"
             )
             
@@ -126,85 +339,93 @@ def main():
                 st.session_state.current_question = question
             
             if st.button("Get Answer", type="primary", use_container_width=True):
-                if st.session_state.current_question.strip():
-                    st.info(f"Analyzing: {st.session_state.current_question}")
+                questions = [q.strip() for q in st.session_state.current_question.splitlines() if q.strip()]
+                if questions:
+                    st.info(f"Analyzing {len(questions)} question(s)")
                     
-                    with st.spinner("Processing your question..."):
+                    with st.spinner("Processing your questions..."):
                         try:
-                            prediction = st.session_state.qa_model(
-                                question=st.session_state.current_question, 
-                                context=st.session_state.document_text
-                            )
-                            
-                            st.markdown("---")
-                            st.subheader("Answer:")
-                            
-                            # Answer display
-                            st.markdown(f"""
-                            <div style="
-                                background-color: #f0f2f6;
-                                padding: 20px;
-                                border-radius: 10px;
-                                border-left: 5px solid #1f77b4;
-                                margin: 10px 0;
-                            ">
-                                <h3 style="margin-top: 0; color: #1f77b4;">
-                                    {prediction['answer']}
-                                </h3>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Confidence metrics
-                            confidence = round(prediction['score'] * 100, 1)
-                            
-                            col_conf1, col_conf2, col_conf3 = st.columns(3)
-                            with col_conf1:
-                                st.metric("Confidence", f"{confidence}%")
-                            
-                            with col_conf2:
-                                if confidence >= 60:
-                                    st.success("High Confidence")
-                                elif confidence >= 30:
-                                    st.warning("Medium Confidence")
-                                else:
-                                    st.error("Low Confidence")
-                            
-                            with col_conf3:
-                                st.metric("Answer Length", f"{len(prediction['answer'])} chars")
+                            qa_model = load_qa_model(QA_MODELS[st.session_state.model_choice])
+                            if qa_model is None:
+                                st.stop()
                             
-                            # Context view
-                            answer_text = prediction['answer']
-                            if answer_text in st.session_state.document_text:
-                                start_pos = st.session_state.document_text.find(answer_text)
-                                context_start = max(0, start_pos - 200)
-                                context_end = min(len(st.session_state.document_text), start_pos + len(answer_text) + 200)
-                                context_snippet = st.session_state.document_text[context_start:context_end]
-                                
-                                with st.expander("View answer in context"):
-                                    highlighted_context = context_snippet.replace(answer_text, f"**{answer_text}**")
-                                    st.markdown(highlighted_context)
+                            # Ask all questions in one call so the pipeline batches them through the model.
+                            # Long documents are split into overlapping windows and the best span is kept.
+                            predictions = qa_model(
+                                [{"question": q, "context": st.session_state.document_text} for q in questions],
+                                batch_size=min(8, len(questions)),
+                                doc_stride=128,
+                                max_seq_len=384,
+                                max_answer_len=100,
+                                handle_impossible_answer=True,
+                                top_k=1
+                            )
+                            if isinstance(predictions, dict):
+                                predictions = [predictions]
                             
-                            # Technical details
-                            with st.expander("Technical Details"):
-                                st.json(prediction)
+                            for q, prediction in zip(questions, predictions):
+                                st.markdown("---")
+                                st.subheader(q)
+                                display_answer(prediction)
                             
                         except Exception as e:
                             st.error(f"Error processing question: {str(e)}")
                 else:
-                    st.warning("Please enter a question")
+                    st.warning("Please enter at least one question")
         
         with tab2:
             st.header("Document Content")
             st.info(f"Document length: {len(st.session_state.document_text)} characters")
             
-            # Search functionality
+            document_text = st.session_state.document_text
+            
+            # Only one page of the document is sent to the browser per rerun
+            offsets = page_offsets(document_text, DOCUMENT_PAGE_SIZE)
+            page_count = len(offsets)
+            if st.session_state.get('document_page', 0) >= page_count:
+                st.session_state.document_page = 0
+            
+            # Search functionality - matches are counted over the whole document, not just the visible page
             search_term = st.text_input("Search in document:", placeholder="Enter text to highlight...")
+            search_pattern = None
             
             if search_term and search_term.strip():
-                # Create highlighted version using HTML
-                highlighted_text = st.session_state.document_text.replace(
-                    search_term, 
-                    f'<mark style="background-color: yellow; padding: 2px 4px; border-radius: 3px;">{search_term}</mark>'
+                search_pattern = re.compile(re.escape(search_term), re.IGNORECASE)
+                match_count = 0
+                match_pages = []
+                for match in search_pattern.finditer(document_text):
+                    match_count += 1
+                    match_page = bisect.bisect_right(offsets, match.start()) - 1
+                    if not match_pages or match_pages[-1] != match_page:
+                        match_pages.append(match_page)
+                
+                if match_pages:
+                    page_list = ", ".join(str(i + 1) for i in match_pages[:20])
+                    if len(match_pages) > 20:
+                        page_list += ", ..."
+                    st.info(f"{match_count} match(es) on page(s): {page_list}")
+                    # Jump to the first matching page whenever the search term changes
+                    if search_term != st.session_state.get('last_search_term'):
+                        st.session_state.document_page = match_pages[0]
+                else:
+                    st.warning("No matches found in the document")
+            st.session_state.last_search_term = search_term
+            
+            page = st.selectbox(
+                "Page",
+                range(page_count),
+                format_func=lambda i: f"{i + 1} of {page_count}",
+                key="document_page"
+            )
+            page_end = offsets[page + 1] if page + 1 < page_count else len(document_text)
+            page_text = document_text[offsets[page]:page_end]
+            
+            if search_pattern:
+                # Create highlighted version of the visible page using HTML
+                highlighted_text = highlight_matches(
+                    page_text,
+                    search_pattern,
+                    '<mark style="background-color: yellow; padding: 2px 4px; border-radius: 3px;">{}</mark>'
                 )
                 
                 st.markdown("**Document with highlighted search results:**")
@@ -214,8 +435,8 @@ def main():
                 )
             else:
                 st.text_area(
-                    "Full document:",
-                    st.session_state.document_text,
+                    "Document page:",
+                    page_text,
                     height=500,
                     disabled=True
                 )
@@ -235,7 +456,7 @@ def main():
         ## Getting Started
         
         ### Features:
-        - Advanced natural language processing using RoBERTa model
+        - Advanced natural language processing using TinyRoBERTa or RoBERTa models
         - Confidence scoring for answer reliability
         - Context highlighting to show source of answers
         - Document search and download capabilities